@@ -1,17 +1,31 @@
 #!/usr/bin/env python3
 """AI 기반 트렌드 분석기 - OpenRouter 연동 (다중 모델 비교)"""
 
-import json
+import asyncio
+import hashlib
+import heapq
 import os
+from collections.abc import Iterator
 from datetime import datetime, timezone, timedelta
+from itertools import islice
 from pathlib import Path
 
-import requests
-from openai import OpenAI
+import orjson
+from openai import AsyncOpenAI
+
+from jsonl_log import append_entry
 
 KST = timezone(timedelta(hours=9))
+_ROOT = Path(__file__).resolve().parent.parent
+_LOG_DIR = _ROOT / "data" / "logs"
+_ANALYSIS_DIR = _ROOT / "data" / "analysis"
+_ANALYSIS_CACHE_DIR = _ANALYSIS_DIR / "cache"
 OPENROUTER_BASE_URL = "https://openrouter.ai/api/v1"
 MAX_TITLES = 500
+MODEL_TIMEOUT = 60  # 모델별 최대 대기 시간 (초)
+MAX_CONCURRENCY = 3  # 동시에 호출할 최대 모델 수
+MAX_RETRIES = 3  # 429/5xx/연결 오류 시 재시도 횟수 (지수 백오프, Retry-After 준수)
+DEFAULT_CACHE_TTL_HOURS = 6  # 동일 게시물 집합에 대한 분석 결과 재사용 기간
 
 # 사용할 모델
 COMPARE_MODELS = [
@@ -20,65 +34,8 @@ COMPARE_MODELS = [
     "openai/gpt-oss-120b:free",
 ]
 
-
-def load_recent_scrapes(max_entries: int = 1) -> list[dict]:
-    """최근 N회 스크래핑 데이터를 로드합니다."""
-    script_dir = Path(__file__).parent.parent
-    log_dir = script_dir / "data" / "logs"
-
-    now = datetime.now(KST)
-    entries: list[tuple[datetime, dict]] = []
-
-    for i in range(2):
-        date = now - timedelta(days=i)
-        log_file = log_dir / f"{date.strftime('%Y-%m-%d')}.json"
-
-        if not log_file.exists():
-            continue
-
-        with open(log_file, "r", encoding="utf-8") as f:
-            data = json.load(f)
-
-        for entry in data:
-            try:
-                collected_at = datetime.fromisoformat(entry["collected_at"])
-            except Exception:
-                continue
-            entries.append((collected_at, entry))
-
-    if not entries:
-        return []
-
-    entries.sort(key=lambda x: x[0])
-    if max_entries < 1:
-        max_entries = 1
-    entries = entries[-max_entries:]
-
-    all_posts: list[dict] = []
-    for _, entry in entries:
-        for post in entry.get("posts", []):
-            post["collected_at"] = entry.get("collected_at")
-            all_posts.append(post)
-
-    seen_ids = set()
-    unique_posts = []
-    for post in all_posts:
-        post_id = post.get("id")
-        if post_id and post_id in seen_ids:
-            continue
-        if post_id:
-            seen_ids.add(post_id)
-        unique_posts.append(post)
-
-    return unique_posts
-
-
-def analyze_with_ai(posts: list[dict], model: str, client: OpenAI) -> str | None:
-    """지정된 모델로 트렌드를 분석합니다."""
-    titles = [f"- {post['title']}" for post in posts[:MAX_TITLES]]
-    titles_text = "\n".join(titles)
-
-    prompt = f"""다음은 뽐뿌 릴레이 게시판에서 최근 수집된 게시물 제목들입니다.
+# 고정 지시문을 앞에, 변하는 제목 목록을 맨 뒤에 두어 프로바이더의 프리픽스 캐시를 활용
+_PROMPT_PREFIX = """다음은 뽐뿌 릴레이 게시판에서 최근 수집된 게시물 제목들입니다.
 이 데이터를 바탕으로 트렌드 분석과 SNS 홍보 문구를 작성해주세요.
 
 ## 분석 요청사항
@@ -110,13 +67,172 @@ def analyze_with_ai(posts: list[dict], model: str, client: OpenAI) -> str | None
 - "쌀먹에서 다양한 혜택을 만나보세요!"
 - "추천인 프로그램과 함께 즐거운 경험을 해보세요~"
 
-## 게시물 제목 ({len(posts)}개)
-{titles_text}
+한국어로 작성해주세요.
+
+## 게시물 제목
+"""
+
+# SNS 문구가 끊겼을 때 문구만 다시 생성하는 프롬프트
+_SNS_PROMPT_TEMPLATE = """아래 게시물 제목을 참고해서 SNS 홍보 문구 1개만 작성해주세요.
+
+조건:
+- 분석적 말투와 제안형 문장
+- 광고 말투 금지 ("~해보세요", "~있어요")
+- 이모지는 1-2개만, 없어도 됨
+- 해시태그 2개 이하
+- 100자 내외
+- 따옴표로 감싸서 1줄로만 출력
+
+## 게시물 제목 ({count}개 중 100개)
+{titles}
+"""
+
+# 프롬프트를 고치면 캐시 키가 바뀌어 이전 결과를 재사용하지 않음
+_PROMPT_HASH = hashlib.sha256(
+    (_PROMPT_PREFIX + _SNS_PROMPT_TEMPLATE).encode()
+).hexdigest()
 
-한국어로 작성해주세요."""
 
+def iter_log_file(log_dir: Path, date_str: str) -> Iterator[dict]:
+    """일별 스크래핑 로그 엔트리를 한 줄씩 읽어 반환합니다."""
+    log_file = log_dir / f"{date_str}.jsonl"
+    if log_file.exists():
+        with open(log_file, "rb") as f:
+            for line in f:
+                if line.strip():
+                    yield orjson.loads(line)
+        return
+
+    # 이전 형식(JSON 배열) 호환
+    legacy_file = log_dir / f"{date_str}.json"
+    if legacy_file.exists():
+        with open(legacy_file, "rb") as f:
+            yield from orjson.loads(f.read())
+
+
+def iter_recent_log_entries() -> Iterator[tuple[str, dict]]:
+    """오늘/어제 스크래핑 로그의 (수집 시각, 엔트리)를 순서대로 반환합니다."""
+    now = datetime.now(KST)
+
+    for i in range(2):
+        date = now - timedelta(days=i)
+
+        # collected_at은 모두 KST ISO-8601 문자열이라 파싱 없이 문자열 순서 = 시간 순서
+        for entry in iter_log_file(_LOG_DIR, date.strftime("%Y-%m-%d")):
+            collected_at = entry.get("collected_at")
+            if not isinstance(collected_at, str):
+                continue
+            yield collected_at, entry
+
+
+def load_recent_scrapes(max_entries: int = 1) -> list[dict]:
+    """최근 N회 스크래핑 데이터를 로드합니다."""
+    if max_entries < 1:
+        max_entries = 1
+
+    # 전체 정렬 대신 최근 max_entries개만 유지
+    entries = heapq.nlargest(max_entries, iter_recent_log_entries(), key=lambda x: x[0])
+    if not entries:
+        return []
+    entries.reverse()
+
+    all_posts = [post for _, entry in entries for post in entry.get("posts", [])]
+
+    # id가 없는 게시물은 중복 판단이 불가하므로 그대로 유지
+    return [post for post in all_posts if not post.get("id")] + list(
+        {post["id"]: post for post in all_posts if post.get("id")}.values()
+    )
+
+
+def get_cache_ttl_hours() -> float:
+    """ANALYSIS_CACHE_TTL_HOURS 환경변수에서 캐시 유효 시간을 읽습니다."""
+    env_value = os.environ.get("ANALYSIS_CACHE_TTL_HOURS", "").strip()
     try:
-        response = client.chat.completions.create(
+        return float(env_value) if env_value else DEFAULT_CACHE_TTL_HOURS
+    except ValueError:
+        return DEFAULT_CACHE_TTL_HOURS
+
+
+def get_cache_key(posts: list[dict], model: str) -> str:
+    """프롬프트 버전, 분석 대상 게시물 ID, 모델로 캐시 키를 만듭니다."""
+    post_ids = sorted(post.get("id", "") for post in posts[:MAX_TITLES])
+    key_source = _PROMPT_HASH + "\n".join(post_ids) + model
+    return hashlib.sha256(key_source.encode()).hexdigest()
+
+
+def load_cached_analysis(key: str) -> str | None:
+    """유효 기간 내의 캐시된 분석 결과를 반환합니다."""
+    cache_file = _ANALYSIS_CACHE_DIR / f"{key}.json"
+
+    if not cache_file.exists():
+        return None
+
+    try:
+        with open(cache_file, "rb") as f:
+            cached = orjson.loads(f.read())
+        cached_at = datetime.fromisoformat(cached["cached_at"])
+    except Exception:
+        return None
+
+    # 파일 mtime은 체크아웃 시점으로 바뀌므로 저장된 시각으로 판단
+    if datetime.now(KST) - cached_at > timedelta(hours=get_cache_ttl_hours()):
+        return None
+
+    return cached.get("analysis")
+
+
+def save_cached_analysis(key: str, model: str, analysis: str) -> None:
+    """분석 결과를 캐시에 원자적으로 저장하고 만료된 캐시를 정리합니다."""
+    _ANALYSIS_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+
+    now = datetime.now(KST)
+    ttl = timedelta(hours=get_cache_ttl_hours())
+
+    for old_file in _ANALYSIS_CACHE_DIR.glob("*.json"):
+        try:
+            with open(old_file, "rb") as f:
+                cached_at = datetime.fromisoformat(orjson.loads(f.read())["cached_at"])
+        except Exception:
+            continue
+        if now - cached_at > ttl:
+            old_file.unlink(missing_ok=True)
+
+    cache_file = _ANALYSIS_CACHE_DIR / f"{key}.json"
+    tmp_file = cache_file.with_suffix(".tmp")
+    with open(tmp_file, "wb") as f:
+        f.write(orjson.dumps(
+            {"cached_at": now.isoformat(), "model": model, "analysis": analysis},
+            option=orjson.OPT_INDENT_2,
+        ))
+    os.replace(tmp_file, cache_file)
+
+
+def extract_titles(posts: list[dict]) -> tuple[str, ...]:
+    """분석에 사용할 제목만 한 번 추출합니다."""
+    return tuple(post["title"] for post in islice(posts, MAX_TITLES))
+
+
+def build_prompt(titles: tuple[str, ...]) -> str:
+    """분석 프롬프트를 생성합니다."""
+    return _PROMPT_PREFIX + "- " + "\n- ".join(titles)
+
+
+async def analyze_with_ai(
+    prompt: str,
+    titles: tuple[str, ...],
+    post_count: int,
+    cache_key: str,
+    model: str,
+    client: AsyncOpenAI,
+) -> str | None:
+    """지정된 모델로 트렌드를 분석합니다."""
+    cached = load_cached_analysis(cache_key)
+    if cached:
+        print(f"  {model} 캐시 사용")
+        return cached
+
+    try:
+        response = await client.chat.completions.create(
             model=model,
             max_tokens=1024,
             messages=[{"role": "user", "content": prompt}],
@@ -124,7 +240,12 @@ def analyze_with_ai(posts: list[dict], model: str, client: OpenAI) -> str | None
 
         content = response.choices[0].message.content
         if content and content.strip():
-            fixed = ensure_complete_sns_copy(content, posts, client, model)
+            fixed, complete = await ensure_complete_sns_copy(
+                content, titles, post_count, client, model
+            )
+            # 문구 보완에 실패한 결과는 다음 실행에서 다시 시도하도록 캐시하지 않음
+            if complete:
+                save_cached_analysis(cache_key, model, fixed)
             return fixed
         return None
 
@@ -133,52 +254,35 @@ def analyze_with_ai(posts: list[dict], model: str, client: OpenAI) -> str | None
         return None
 
 
-def ensure_complete_sns_copy(text: str, posts: list[dict], client: OpenAI, model: str) -> str:
-    """SNS 문구가 중간에 끊겼다면 보완합니다."""
+async def ensure_complete_sns_copy(
+    text: str, titles: tuple[str, ...], post_count: int, client: AsyncOpenAI, model: str
+) -> tuple[str, bool]:
+    """SNS 문구가 중간에 끊겼다면 보완합니다. (결과, 문구 완성 여부)를 반환합니다."""
     if "SNS 홍보 문구" not in text:
-        return text
+        return text, True
 
     if text.count('"') % 2 == 0:
-        return text
+        return text, True
 
-    sns_line = generate_sns_copy(posts, client, model)
+    sns_line = await generate_sns_copy(titles, post_count, client, model)
     if not sns_line:
-        return text + "\n\n(문구가 중간에 끊겼습니다)"
+        return text + "\n\n(문구가 중간에 끊겼습니다)", False
 
-    lines = text.splitlines()
-    last_quote_idx = None
-    for i, line in enumerate(lines):
-        if '"' in line:
-            last_quote_idx = i
-    if last_quote_idx is None:
-        return text + "\n\n" + sns_line
+    # 끝에서부터 마지막 따옴표를 찾아 그 줄부터 새 문구로 교체
+    last_quote = text.rfind('"')
+    line_start = text.rfind("\n", 0, last_quote) + 1
+    return text[:line_start] + sns_line, True
 
-    kept = lines[:last_quote_idx]
-    kept.append(sns_line)
-    return "\n".join(kept)
 
-
-def generate_sns_copy(posts: list[dict], client: OpenAI, model: str) -> str | None:
+async def generate_sns_copy(
+    titles: tuple[str, ...], post_count: int, client: AsyncOpenAI, model: str
+) -> str | None:
     """SNS 홍보 문구만 별도 생성합니다."""
-    titles = [f"- {post['title']}" for post in posts[:100]]
-    titles_text = "\n".join(titles)
-
-    prompt = f"""아래 게시물 제목을 참고해서 SNS 홍보 문구 1개만 작성해주세요.
-
-조건:
-- 분석적 말투와 제안형 문장
-- 광고 말투 금지 ("~해보세요", "~있어요")
-- 이모지는 1-2개만, 없어도 됨
-- 해시태그 2개 이하
-- 100자 내외
-- 따옴표로 감싸서 1줄로만 출력
-
-## 게시물 제목 ({len(posts)}개 중 100개)
-{titles_text}
-"""
+    titles_text = "- " + "\n- ".join(titles[:100])
+    prompt = _SNS_PROMPT_TEMPLATE.format(count=post_count, titles=titles_text)
 
     try:
-        response = client.chat.completions.create(
+        response = await client.chat.completions.create(
             model=model,
             max_tokens=256,
             messages=[{"role": "user", "content": prompt}],
@@ -192,70 +296,156 @@ def generate_sns_copy(posts: list[dict], client: OpenAI, model: str) -> str | No
     return None
 
 
-def analyze_with_multiple_models(posts: list[dict]) -> list[dict]:
-    """여러 모델로 분석하여 모든 결과를 반환합니다."""
+async def analyze_with_timeout(
+    prompt: str,
+    titles: tuple[str, ...],
+    post_count: int,
+    cache_key: str,
+    model: str,
+    client: AsyncOpenAI,
+    semaphore: asyncio.Semaphore,
+) -> str | None:
+    """동시 호출 수 제한과 모델별 타임아웃을 적용해 분석합니다."""
+    try:
+        async with semaphore:
+            print(f"모델 시도: {model}")
+            result = await asyncio.wait_for(
+                analyze_with_ai(prompt, titles, post_count, cache_key, model, client),
+                timeout=MODEL_TIMEOUT,
+            )
+    except asyncio.TimeoutError:
+        print(f"  ✗ {model} 시간 초과 ({MODEL_TIMEOUT}초)")
+        return None
+
+    if result:
+        print(f"  ✓ {model} 성공")
+    else:
+        print(f"  ✗ {model} 실패 또는 빈 응답")
+    return result
+
+
+def create_client() -> AsyncOpenAI | None:
+    """OpenRouter 클라이언트를 생성합니다. API 키가 없으면 None."""
     api_key = os.environ.get("OPENROUTER_API_KEY")
     if not api_key:
-        return [{"model": "error", "analysis": "Error: OPENROUTER_API_KEY not set"}]
+        return None
 
-    client = OpenAI(
+    # 재시도는 SDK에 맡김: RateLimitError/APIConnectionError/5xx에 지수 백오프 + Retry-After
+    return AsyncOpenAI(
         base_url=OPENROUTER_BASE_URL,
         api_key=api_key,
+        max_retries=MAX_RETRIES,
     )
 
-    results = []
 
-    for model in COMPARE_MODELS:
-        print(f"모델 시도: {model}")
-        result = analyze_with_ai(posts, model, client)
-        if result:
+async def analyze_with_multiple_models(posts: list[dict]) -> list[dict]:
+    """여러 모델로 동시에 분석하여 모든 결과를 반환합니다."""
+    client = create_client()
+    if client is None:
+        return [{"model": "error", "analysis": "Error: OPENROUTER_API_KEY not set"}]
+
+    semaphore = asyncio.Semaphore(MAX_CONCURRENCY)
+    titles = extract_titles(posts)
+    prompt = build_prompt(titles)
+
+    tasks = [
+        analyze_with_timeout(
+            prompt,
+            titles,
+            len(posts),
+            get_cache_key(posts, model),
+            model,
+            client,
+            semaphore,
+        )
+        for model in COMPARE_MODELS
+    ]
+    outputs = await asyncio.gather(*tasks, return_exceptions=True)
+
+    results = []
+    for model, output in zip(COMPARE_MODELS, outputs):
+        if isinstance(output, BaseException):
+            print(f"  ✗ {model} 예외 발생: {output}")
+            continue
+        if output:
             results.append({
                 "model": model,
-                "analysis": result,
+                "analysis": output,
             })
-            print(f"  ✓ 성공")
-        else:
-            print(f"  ✗ 실패 또는 빈 응답")
 
     return results
 
 
+async def analyze_first_success(posts: list[dict]) -> list[dict]:
+    """여러 모델을 동시에 호출하고 가장 먼저 성공한 결과 1개만 반환합니다."""
+    client = create_client()
+    if client is None:
+        return [{"model": "error", "analysis": "Error: OPENROUTER_API_KEY not set"}]
+
+    semaphore = asyncio.Semaphore(MAX_CONCURRENCY)
+    titles = extract_titles(posts)
+    prompt = build_prompt(titles)
+
+    tasks = {
+        asyncio.create_task(analyze_with_timeout(
+            prompt,
+            titles,
+            len(posts),
+            get_cache_key(posts, model),
+            model,
+            client,
+            semaphore,
+        )): model
+        for model in COMPARE_MODELS
+    }
+    pending = set(tasks)
+
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                model = tasks[task]
+                if task.exception() is not None:
+                    print(f"  ✗ {model} 예외 발생: {task.exception()}")
+                    continue
+                if task.result():
+                    return [{"model": model, "analysis": task.result()}]
+    finally:
+        # 나머지 모델 호출은 취소해 비용과 토큰을 아낌
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+
+    return []
+
+
 def build_error_result(message: str) -> list[dict]:
     """에러 메시지를 텔레그램으로 보내기 위한 단일 결과 형식."""
     return [{"model": "error", "analysis": message}]
 
 
 def save_analysis(results: list[dict], post_count: int) -> str:
-    """분석 결과를 저장합니다."""
+    """분석 결과를 일별 JSONL 파일에 추가합니다."""
     now = datetime.now(KST)
     date_str = now.strftime("%Y-%m-%d")
 
-    script_dir = Path(__file__).parent.parent
-    analysis_dir = script_dir / "data" / "analysis"
-    analysis_dir.mkdir(parents=True, exist_ok=True)
+    _ANALYSIS_DIR.mkdir(parents=True, exist_ok=True)
 
-    analysis_file = analysis_dir / f"{date_str}.json"
-
-    if analysis_file.exists():
-        with open(analysis_file, "r", encoding="utf-8") as f:
-            data = json.load(f)
-    else:
-        data = []
+    analysis_file = _ANALYSIS_DIR / f"{date_str}.jsonl"
 
     entry = {
         "analyzed_at": now.isoformat(),
         "post_count": post_count,
         "results": results,  # 여러 모델 결과
     }
-    data.append(entry)
 
-    with open(analysis_file, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+    # 기존 내용을 다시 읽고 쓰지 않고 한 줄만 추가
+    append_entry(analysis_file, entry)
 
     return str(analysis_file)
 
 
-def main():
+async def main():
     print(f"[{datetime.now(KST).isoformat()}] 트렌드 분석 시작...")
 
     env_value = os.environ.get("ANALYSIS_RECENT_SCRAPES", "").strip()
@@ -263,6 +453,12 @@ def main():
         recent_scrapes = int(env_value) if env_value else 6
     except ValueError:
         recent_scrapes = 6
+    # all: 모든 모델 결과 비교, first: 가장 먼저 성공한 모델 결과만 사용
+    analysis_mode = os.environ.get("ANALYSIS_MODE", "").strip().lower() or "all"
+    if analysis_mode not in ("all", "first"):
+        analysis_mode = "all"
+    print(f"분석 모드: {analysis_mode}")
+
     posts = load_recent_scrapes(recent_scrapes)
     print(f"분석 대상 게시물: {len(posts)}개 (최근 {recent_scrapes}회 스크래핑)")
 
@@ -275,7 +471,10 @@ def main():
         print(f"\n저장 완료: {analysis_file}")
         return
 
-    results = analyze_with_multiple_models(posts)
+    if analysis_mode == "first":
+        results = await analyze_first_success(posts)
+    else:
+        results = await analyze_with_multiple_models(posts)
     if not results:
         results = build_error_result("분석 실패: 모든 모델 호출 실패 또는 빈 응답")
 
@@ -289,4 +488,4 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
+    asyncio.run(main())
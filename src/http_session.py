@@ -0,0 +1,46 @@
+"""스크래퍼/알림 공용 HTTP 세션 (연결 재사용, 재시도)"""
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# 모든 요청을 같은 세션으로 보내 TCP/TLS 연결을 재사용
+SESSION = requests.Session()
+SESSION.headers.update({
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36",
+    "Accept-Encoding": "gzip, deflate",
+})
+
+# 기본: GET 등 멱등 요청만 429/5xx에 재시도 (POST는 urllib3 기본값대로 제외)
+SESSION.mount(
+    "https://",
+    HTTPAdapter(
+        pool_connections=4,
+        pool_maxsize=8,
+        max_retries=Retry(
+            total=3,
+            backoff_factor=1,
+            status_forcelist=[429, 500, 502, 503, 504],
+            raise_on_status=False,  # 재시도 소진 시 마지막 응답을 그대로 반환
+        ),
+    ),
+)
+
+# 텔레그램 sendMessage(POST): 5xx나 읽기 타임아웃 뒤에는 이미 전달됐을 수 있어
+# 다시 보내면 중복 메시지가 되므로, 처리되지 않은 것이 확실한 429만 재시도
+SESSION.mount(
+    "https://api.telegram.org/",
+    HTTPAdapter(
+        pool_connections=4,
+        pool_maxsize=8,
+        max_retries=Retry(
+            total=3,
+            read=0,
+            other=0,
+            backoff_factor=1,
+            status_forcelist=[429],
+            allowed_methods=["POST"],
+            raise_on_status=False,
+        ),
+    ),
+)
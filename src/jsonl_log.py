@@ -0,0 +1,54 @@
+"""일별 JSONL(한 줄에 한 엔트리) 로그 파일 공용 함수"""
+
+import fcntl
+import os
+from pathlib import Path
+from typing import BinaryIO
+
+import orjson
+
+
+def read_last_line(path: Path, chunk_size: int = 64 * 1024) -> bytes | None:
+    """파일 끝에서부터 읽어 마지막 비어있지 않은 줄을 반환합니다."""
+    with open(path, "rb") as f:
+        pos = f.seek(0, os.SEEK_END)
+        tail = b""
+
+        while pos > 0:
+            step = min(chunk_size, pos)
+            pos -= step
+            f.seek(pos)
+            tail = f.read(step) + tail
+
+            stripped = tail.rstrip(b"\n")
+            newline = stripped.rfind(b"\n")
+            if newline != -1:
+                return stripped[newline + 1:]
+
+    return tail.rstrip(b"\n") or None
+
+
+def migrate_json_to_jsonl(json_file: Path, out: BinaryIO) -> None:
+    """기존 JSON 배열 파일을 JSONL 형식으로 out에 옮깁니다."""
+    if not json_file.exists():
+        return
+
+    with open(json_file, "rb") as f:
+        data = orjson.loads(f.read())
+
+    for entry in data:
+        out.write(orjson.dumps(entry) + b"\n")
+
+    json_file.unlink()
+
+
+def append_entry(jsonl_file: Path, entry: dict) -> None:
+    """엔트리 1건을 JSONL 파일에 추가합니다.
+
+    같은 이름의 이전 형식(JSON 배열) 파일이 있으면 먼저 한 번만 변환합니다.
+    동시 실행에 대비해 배타 잠금을 건 상태로 씁니다.
+    """
+    with open(jsonl_file, "ab") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        migrate_json_to_jsonl(jsonl_file.with_suffix(".json"), f)
+        f.write(orjson.dumps(entry) + b"\n")
@@ -1,30 +1,39 @@
 #!/usr/bin/env python3
 """텔레그램 알림 전송 (모델별 개별 메시지)"""
 
-import json
 import os
+import re
+from bisect import bisect_left
 from datetime import datetime, timezone, timedelta
 from pathlib import Path
 
+import orjson
 import requests
 
+from http_session import SESSION
+from jsonl_log import read_last_line
+
 KST = timezone(timedelta(hours=9))
+_ROOT = Path(__file__).resolve().parent.parent
+_ANALYSIS_DIR = _ROOT / "data" / "analysis"
 MAX_BODY_LEN = 3000
+MAX_ERROR_BODY_LEN = 512
+_MD_STRIP = str.maketrans("", "", "*`#")
+_NEWLINE_RE = re.compile("\n")
+_HEADER_TEMPLATE = "📊 [{index}/{total}] {model}\n🕐 {time} | 📝 {count}개 게시물 분석"
 
+# 파일 경로 -> (mtime_ns, 마지막 분석 엔트리). 경로마다 최신 결과 하나만 유지
+_CACHE: dict[str, tuple[int, dict | None]] = {}
 
-def get_latest_analysis() -> dict | None:
-    """오늘의 최신 분석 결과를 가져옵니다."""
-    script_dir = Path(__file__).parent.parent
-    analysis_dir = script_dir / "data" / "analysis"
 
-    today = datetime.now(KST).strftime("%Y-%m-%d")
-    analysis_file = analysis_dir / f"{today}.json"
+def load_last_entry(path: Path) -> dict | None:
+    """분석 파일(JSONL 또는 이전 형식 JSON 배열)의 마지막 엔트리를 읽습니다."""
+    if path.suffix == ".jsonl":
+        last_line = read_last_line(path)
+        return orjson.loads(last_line) if last_line else None
 
-    if not analysis_file.exists():
-        return None
-
-    with open(analysis_file, "r", encoding="utf-8") as f:
-        data = json.load(f)
+    with open(path, "rb") as f:
+        data = orjson.loads(f.read())
 
     if not data:
         return None
@@ -32,9 +41,31 @@ def get_latest_analysis() -> dict | None:
     return data[-1]
 
 
+def get_latest_analysis() -> dict | None:
+    """오늘의 최신 분석 결과를 가져옵니다."""
+    today = datetime.now(KST).strftime("%Y-%m-%d")
+    analysis_file = _ANALYSIS_DIR / f"{today}.jsonl"
+
+    if not analysis_file.exists():
+        # 이전 형식(JSON 배열) 호환
+        analysis_file = _ANALYSIS_DIR / f"{today}.json"
+        if not analysis_file.exists():
+            return None
+
+    # 파일이 바뀌지 않았다면 이전에 파싱한 결과를 재사용
+    key = str(analysis_file)
+    mtime_ns = analysis_file.stat().st_mtime_ns
+    cached = _CACHE.get(key)
+    if cached is None or cached[0] != mtime_ns:
+        cached = (mtime_ns, load_last_entry(analysis_file))
+        _CACHE[key] = cached
+
+    return cached[1]
+
+
 def clean_text(text: str) -> str:
     """마크다운 기호를 제거합니다."""
-    return text.replace("**", "").replace("*", "").replace("`", "").replace("##", "").replace("#", "")
+    return text.translate(_MD_STRIP)
 
 
 def build_header(entry: dict, result: dict, index: int, total: int) -> str:
@@ -44,9 +75,13 @@ def build_header(entry: dict, result: dict, index: int, total: int) -> str:
     post_count = entry.get("post_count", 0)
 
     model_name = result["model"].split("/")[-1].replace(":free", "")
-    header = f"""📊 [{index}/{total}] {model_name}
-🕐 {time_str} | 📝 {post_count}개 게시물 분석"""
-    return header
+    return _HEADER_TEMPLATE.format_map({
+        "index": index,
+        "total": total,
+        "model": model_name,
+        "time": time_str,
+        "count": post_count,
+    })
 
 
 def split_text(text: str, max_len: int) -> list[str]:
@@ -54,17 +89,24 @@ def split_text(text: str, max_len: int) -> list[str]:
     if not text:
         return [""]
 
+    # 줄바꿈 위치를 한 번만 구해두고 매 분할마다 이진 탐색
+    newlines = [m.start() for m in _NEWLINE_RE.finditer(text)]
     parts = []
-    remaining = text
+    start = 0
+
+    while len(text) - start > max_len:
+        idx = bisect_left(newlines, start + max_len) - 1
+        if idx >= 0 and newlines[idx] >= start:
+            cut = newlines[idx]
+        else:
+            cut = start + max_len
+        parts.append(text[start:cut].rstrip())
 
-    while len(remaining) > max_len:
-        cut = remaining.rfind("\n", 0, max_len)
-        if cut == -1:
-            cut = max_len
-        parts.append(remaining[:cut].rstrip())
-        remaining = remaining[cut:].lstrip("\n")
+        start = cut
+        while start < len(text) and text[start] == "\n":
+            start += 1
 
-    parts.append(remaining)
+    parts.append(text[start:])
     return parts
 
 
@@ -86,10 +128,11 @@ def send_telegram(message: str) -> bool:
     }
 
     try:
-        response = requests.post(url, json=payload, timeout=30)
+        response = SESSION.post(url, json=payload, timeout=30)
         if not response.ok:
-            print(f"텔레그램 API 응답: {response.text}")
-        response.raise_for_status()
+            # 성공 시에는 본문을 읽지 않고, 실패 응답은 앞부분만 출력
+            print(f"텔레그램 API 응답: {response.text[:MAX_ERROR_BODY_LEN]}")
+            response.raise_for_status()
         return True
     except requests.exceptions.RequestException as e:
         print(f"텔레그램 전송 실패: {e}")
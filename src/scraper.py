@@ -1,65 +1,74 @@
 #!/usr/bin/env python3
 """뽐뿌 릴레이 게시판 스크래퍼"""
 
-import json
+import re
 from datetime import datetime, timezone, timedelta
 from pathlib import Path
 
-import requests
-from bs4 import BeautifulSoup
+import orjson
+import soupsieve as sv
+from bs4 import BeautifulSoup, SoupStrainer
+
+from http_session import SESSION
+from jsonl_log import append_entry, read_last_line
 
 URL = "https://www.ppomppu.co.kr/zboard/zboard.php?id=relay"
 KST = timezone(timedelta(hours=9))
 
+# 프로젝트 루트 기준 data/logs 디렉토리
+_ROOT = Path(__file__).resolve().parent.parent
+_LOG_DIR = _ROOT / "data" / "logs"
 
-def fetch_posts() -> list[dict]:
-    """게시판에서 게시물 목록을 가져옵니다."""
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
-    }
+# 행마다 다시 파싱하지 않도록 선택자/정규식을 미리 컴파일
+# 게시물 행만 트리로 생성 (공지 제외). 파싱 시점에는 class 속성 전체 문자열과 비교하므로
+# "baseList bbs_new1"처럼 여러 클래스를 가진 행도 잡도록 토큰 단위로 검사
+_ROW_STRAINER = SoupStrainer(
+    "tr", class_=lambda c: c is not None and "baseList" in c.split()
+)
+_RE_VIEW = re.compile(r"view\.php")  # 제목 링크
+_AUTHOR_SEL = sv.compile("td:has(span.list_name)")  # 작성자 셀
+_CELL_SEL = sv.compile("td")
+_RE_NO = re.compile(r"no=(\d+)")  # 게시물 번호
+_RE_TIME = re.compile(r"^\d{1,2}[:/]\d{2}(?:[:/]\d{2})?$")  # HH:MM(:SS) 또는 YY/MM/DD
 
-    response = requests.get(URL, headers=headers, timeout=30)
-    response.encoding = "euc-kr"  # 뽐뿌는 EUC-KR 인코딩 사용
 
-    soup = BeautifulSoup(response.text, "html.parser")
+def fetch_posts() -> list[dict]:
+    """게시판에서 게시물 목록을 가져옵니다."""
+    response = SESSION.get(URL, timeout=30)
+
+    # 뽐뿌는 EUC-KR로 표기하지만 실제로는 CP949(EUC-KR 상위 집합)로 내려옴.
+    # euc-kr로 넘기면 "똠" 같은 CP949 전용 글자 하나에 전체 파싱이 비어버리므로
+    # 바이트를 cp949로 지정해 파서에서 한 번만 디코딩
+    soup = BeautifulSoup(
+        response.content, "lxml", from_encoding="cp949", parse_only=_ROW_STRAINER
+    )
     posts = []
+    last_row = None
 
-    # 게시물 행 찾기 (baseList 클래스가 있는 tr - 공지 제외)
-    rows = soup.select("tr.baseList")
-
-    for row in rows:
+    # 제목 링크(view.php)를 한 번에 찾고 소속 게시물 행으로 거슬러 올라감
+    for link in soup.find_all("a", href=_RE_VIEW):
         try:
-            # 제목 링크 찾기 (view.php 링크)
-            link = row.select_one("a[href*='view.php']")
-            if not link:
+            row = link.find_parent("tr", class_="baseList")
+            if row is None or row is last_row:  # 행마다 첫 번째 링크만 사용
                 continue
+            last_row = row
 
             title = link.get_text(strip=True)
             href = link.get("href", "")
 
             # 게시물 번호 추출
-            post_id = ""
-            if "no=" in href:
-                post_id = href.split("no=")[-1].split("&")[0]
-
-            # 모든 td 가져오기
-            cells = row.select("td")
-
-            # 작성자 (보통 제목 다음 셀)
-            author = ""
-            for cell in cells:
-                if cell.select_one("span.list_name"):
-                    author = cell.get_text(strip=True)
-                    break
+            match = _RE_NO.search(href)
+            post_id = match.group(1) if match else ""
+
+            # 작성자 (span.list_name을 포함한 셀)
+            author_cell = _AUTHOR_SEL.select_one(row)
+            author = author_cell.get_text(strip=True) if author_cell else ""
 
             # 작성 시간 (날짜/시간 형식 찾기)
             timestamp = ""
-            for cell in cells:
+            for cell in _CELL_SEL.select(row):
                 text = cell.get_text(strip=True)
-                if ":" in text and len(text) <= 10:  # 시간 형식 (HH:MM)
-                    timestamp = text
-                    break
-                elif "/" in text and len(text) <= 10:  # 날짜 형식 (MM/DD)
+                if _RE_TIME.match(text):
                     timestamp = text
                     break
 
@@ -78,56 +87,40 @@ def fetch_posts() -> list[dict]:
 
 def load_latest_log_entry() -> dict | None:
     """가장 최근 스크래핑 로그 1건을 반환합니다."""
-    script_dir = Path(__file__).parent.parent
-    log_dir = script_dir / "data" / "logs"
-
     now = datetime.now(KST)
-    latest_entry = None
-    latest_time = None
 
+    # 오늘 파일이 있으면 어제 파일은 볼 필요가 없음
     for i in range(2):
-        date = now - timedelta(days=i)
-        log_file = log_dir / f"{date.strftime('%Y-%m-%d')}.json"
+        date_str = (now - timedelta(days=i)).strftime("%Y-%m-%d")
+        log_file = _LOG_DIR / f"{date_str}.jsonl"
+        legacy_file = _LOG_DIR / f"{date_str}.json"
 
-        if not log_file.exists():
-            continue
+        if log_file.exists():
+            # 추가 순서대로 기록되므로 파일 끝의 마지막 줄만 읽음
+            last_line = read_last_line(log_file)
+            if last_line:
+                return orjson.loads(last_line)
+        elif legacy_file.exists():
+            # 이전 형식(JSON 배열) 호환: 추가 순서대로 기록되므로 마지막 원소가 최신
+            with open(legacy_file, "rb") as f:
+                data = orjson.loads(f.read())
 
-        with open(log_file, "r", encoding="utf-8") as f:
-            data = json.load(f)
+            if data:
+                return data[-1]
 
-        for entry in data:
-            try:
-                collected_at = datetime.fromisoformat(entry["collected_at"])
-            except Exception:
-                continue
-
-            if latest_time is None or collected_at > latest_time:
-                latest_time = collected_at
-                latest_entry = entry
-
-    return latest_entry
+    return None
 
 
 def save_log(posts: list[dict], raw_post_count: int | None = None) -> str:
-    """수집한 데이터를 JSON 파일에 저장합니다."""
+    """수집한 데이터를 일별 JSONL 파일에 추가합니다."""
     now = datetime.now(KST)
     date_str = now.strftime("%Y-%m-%d")
 
-    # 프로젝트 루트 기준 data/logs 디렉토리
-    script_dir = Path(__file__).parent.parent
-    log_dir = script_dir / "data" / "logs"
-    log_dir.mkdir(parents=True, exist_ok=True)
+    _LOG_DIR.mkdir(parents=True, exist_ok=True)
 
-    log_file = log_dir / f"{date_str}.json"
-
-    # 기존 데이터 로드 또는 새 리스트 생성
-    if log_file.exists():
-        with open(log_file, "r", encoding="utf-8") as f:
-            data = json.load(f)
-    else:
-        data = []
+    log_file = _LOG_DIR / f"{date_str}.jsonl"
 
-    # 새 수집 데이터 추가
+    # 새 수집 데이터
     entry = {
         "collected_at": now.isoformat(),
         "post_count": len(posts),
@@ -135,11 +128,9 @@ def save_log(posts: list[dict], raw_post_count: int | None = None) -> str:
     }
     if raw_post_count is not None:
         entry["raw_post_count"] = raw_post_count
-    data.append(entry)
 
-    # 저장
-    with open(log_file, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+    # 기존 내용을 다시 읽고 쓰지 않고 한 줄만 추가
+    append_entry(log_file, entry)
 
     return str(log_file)
 
@@ -151,14 +142,15 @@ def main():
     latest_entry = load_latest_log_entry()
 
     if latest_entry:
-        seen_ids = {
-            post.get("id")
+        seen_ids = frozenset(
+            post_id
             for post in latest_entry.get("posts", [])
-            if post.get("id")
-        }
+            if (post_id := post.get("id"))
+        )
+        # id가 없는 게시물은 신규 여부를 판단할 수 없어 매번 중복 수집되므로 제외
         posts = [
             post for post in raw_posts
-            if not post.get("id") or post.get("id") not in seen_ids
+            if (post_id := post.get("id")) and post_id not in seen_ids
         ]
     else:
         posts = raw_posts